@@ -11,19 +11,72 @@ import os
 import sys
 import subprocess
 import platform
+import signal
+import socket
 import time
 import requests
-import signal
 import argparse
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# OS detection is constant for the process; compute it once at import
+_OS = platform.system().lower()
+_IS_WINDOWS = _OS == "windows"
+_BINARY_NAME = "telegram-bot-api.exe" if _IS_WINDOWS else "telegram-bot-api"
+
+# Shared HTTP session so repeated GitHub API calls and health-check polls
+# reuse the same pooled TCP/TLS connections instead of reconnecting each time
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+))
+_HTTP.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
 
 def install_dependencies():
-    """Install required Python packages"""
+    """Install required Python packages, skipping pip when nothing changed"""
+    import hashlib
+    import shutil
+
+    # A stamp file with the hash of requirements.txt lets repeat startups
+    # skip the multi-second pip invocation entirely
+    digest = hashlib.sha256(Path("requirements.txt").read_bytes()).hexdigest()
+    stamp = Path(".deps.ok")
+    try:
+        if stamp.read_text() == digest:
+            print("✅ Dependencies already installed, skipping pip")
+            return True
+    except OSError:
+        pass
+
     print("📦 Installing Python dependencies...")
+    pip_cmd = [
+        sys.executable, "-m", "pip", "install",
+        "--disable-pip-version-check", "--no-input", "--prefer-binary",
+        "-r", "requirements.txt",
+    ]
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        uv = shutil.which("uv")
+        if uv:
+            # uv resolves and installs wheels far faster than pip and keeps
+            # a global content-addressed cache across deploys; --python pins
+            # it to this interpreter so it does not demand a venv or install
+            # into a different environment than the one we run from
+            try:
+                subprocess.check_call(
+                    [uv, "pip", "install", "--python", sys.executable,
+                     "-r", "requirements.txt"]
+                )
+            except subprocess.CalledProcessError:
+                print("⚠️ uv install failed, falling back to pip...")
+                subprocess.check_call(pip_cmd)
+        else:
+            subprocess.check_call(pip_cmd)
+        stamp.write_text(digest)
         print("✅ Dependencies installed successfully!")
         return True
     except subprocess.CalledProcessError as e:
@@ -33,73 +86,91 @@ def install_dependencies():
 
 def download_telegram_api_server():
     """Download the Telegram Bot API server if not already present"""
-    
-    # Determine OS and architecture
-    os_name = platform.system().lower()
-    arch = platform.machine().lower()
-    
-    # Construct download URL based on OS
-    if os_name == "windows":
-        url = "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-windows.zip"
-        api_dir = "telegram-bot-api-windows"
-        binary_name = "telegram-bot-api.exe"
-    elif os_name == "linux":
-        url = "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-linux"
-        api_dir = "telegram-bot-api-linux"
-        binary_name = "telegram-bot-api"
-    elif os_name == "darwin":  # macOS
-        url = "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-macos"
-        api_dir = "telegram-bot-api-macos"
-        binary_name = "telegram-bot-api"
-    else:
-        print(f"❌ Unsupported OS: {os_name}")
-        return False
-    
-    print(f"⬇️ Downloading Telegram Bot API server for {os_name}...")
-    
-    # Create API directory if it doesn't exist
+
+    # Phase 1: cheap existence check so warm starts pay a single stat call,
+    # not URL resolution or network I/O
     api_path = Path("telegram-bot-api")
-    api_path.mkdir(exist_ok=True)
-    
-    # Check if binary already exists
+    binary_name = _BINARY_NAME
     binary_path = api_path / "bin" / binary_name
     if binary_path.exists():
         print("✅ Telegram Bot API server already exists!")
         return True
-    
+
+    # Phase 2 (cache miss): resolve the download URL for this OS
+    os_name = _OS
+    urls = {
+        "windows": "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-windows.zip",
+        "linux": "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-linux",
+        "darwin": "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-macos",
+    }
+    url = urls.get(os_name)
+    if url is None:
+        print(f"❌ Unsupported OS: {os_name}")
+        return False
+
+    print(f"⬇️ Downloading Telegram Bot API server for {os_name}...")
+
+    # Create API directory if it doesn't exist
+    api_path.mkdir(exist_ok=True)
+
     try:
-        import urllib.request
+        import shutil
         import zipfile
         import tarfile
-        
+
         # Download the file
         download_path = api_path / f"telegram-api-{os_name}.{'zip' if os_name == 'windows' else 'tar.gz'}"
         print(f"Downloading from: {url}")
-        urllib.request.urlretrieve(url, download_path)
-        
-        # Extract the archive
-        if os_name == "windows":
-            with zipfile.ZipFile(download_path, 'r') as zip_ref:
-                zip_ref.extractall(api_path)
-        else:
-            with tarfile.open(download_path, 'r:gz') as tar_ref:
-                tar_ref.extractall(api_path)
+        # Stream through the pooled session in 1 MiB chunks instead of
+        # urlretrieve's fresh connection and small default buffer
+        with _HTTP.get(url, stream=True, timeout=60, allow_redirects=True) as response:
+            response.raise_for_status()
+            size = int(response.headers.get("Content-Length", 0))
+            # buffering=0: copyfileobj already writes 1 MiB blocks, so the
+            # extra Python-level buffer layer is pure overhead
+            with open(download_path, "wb", buffering=0) as f:
+                # Reserve contiguous extents up front so chunked writes do
+                # not repeatedly extend the file (not available on Windows)
+                if size and hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, size)
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
         
-        # Move the binary to the expected location
+        # Extract the binary to the expected location
         bin_dir = api_path / "bin"
         bin_dir.mkdir(exist_ok=True)
-        
-        # Find the binary and move it to bin directory
-        for file_path in api_path.rglob(binary_name):
-            if file_path.is_file():
-                dest_path = bin_dir / binary_name
-                file_path.rename(dest_path)
-                print(f"✅ Telegram Bot API server installed to: {dest_path}")
-                break
+        dest_path = bin_dir / binary_name
+
+        if os_name == "windows":
+            # Extract just the binary member by exact name match instead of
+            # unpacking the archive and walking the tree afterwards
+            with zipfile.ZipFile(download_path, 'r') as zip_ref:
+                member = next(
+                    (n for n in zip_ref.namelist() if Path(n).name == binary_name),
+                    None
+                )
+                if member is None:
+                    print(f"❌ Could not find {binary_name} in the downloaded archive")
+                    return False
+                with zip_ref.open(member) as src, open(dest_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
         else:
-            print(f"❌ Could not find {binary_name} in the downloaded archive")
-            return False
-        
+            # Extract just the binary member instead of unpacking the whole
+            # archive and walking the extracted tree afterwards. 'r:*'
+            # autodetects gzip/xz compression.
+            with tarfile.open(download_path, 'r:*') as tar_ref:
+                member = next(
+                    (m for m in tar_ref if m.isfile() and Path(m.name).name == binary_name),
+                    None
+                )
+                if member is None:
+                    print(f"❌ Could not find {binary_name} in the downloaded archive")
+                    return False
+                member.name = binary_name
+                # data filter: refuse absolute paths, traversal, device nodes
+                tar_ref.extract(member, path=bin_dir, filter="data")
+
+        print(f"✅ Telegram Bot API server installed to: {dest_path}")
+
         # Make it executable on Unix systems
         if os_name != "windows":
             dest_path.chmod(0o755)
@@ -112,13 +183,25 @@ def download_telegram_api_server():
 
 def check_local_api_server():
     """Check if the local API server is running"""
+    # A plain TCP connect is enough for a liveness probe and costs well
+    # under a millisecond, versus a full HTTP request/response round-trip
     try:
-        response = requests.get("http://localhost:8081", timeout=5)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
+        with socket.create_connection(("127.0.0.1", 8081), timeout=0.2):
+            return True
+    except OSError:
         return False
 
 
+def _wait_ready(timeout=10.0, interval=0.1):
+    """Poll the local API server until it responds or the timeout expires"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if check_local_api_server():
+            return True
+        time.sleep(interval)
+    return False
+
+
 def run_local_api_server(api_id=None, api_hash=None):
     """Start the local Telegram Bot API server in a subprocess"""
     if not api_id or not api_hash:
@@ -128,12 +211,7 @@ def run_local_api_server(api_id=None, api_hash=None):
     
     # Check if the server binary exists
     api_path = Path("telegram-bot-api") / "bin"
-    if platform.system().lower() == "windows":
-        binary_name = "telegram-bot-api.exe"
-    else:
-        binary_name = "telegram-bot-api"
-    
-    binary_path = api_path / binary_name
+    binary_path = api_path / _BINARY_NAME
     if not binary_path.exists():
         print("❌ Telegram Bot API server not found. Attempting to download...")
         if not download_telegram_api_server():
@@ -142,24 +220,46 @@ def run_local_api_server(api_id=None, api_hash=None):
     
     print(f"🚀 Starting local Telegram Bot API server on port 8081...")
     
-    cmd = [
-        str(binary_path),
-        f"--api-id={api_id}",
-        f"--api-hash={api_hash}",
-        "--local",
-        "--http-port=8081"
-    ]
-    
+    # Credentials go through the environment (the server reads
+    # TELEGRAM_API_ID/TELEGRAM_API_HASH) so the api_hash never shows up in
+    # /proc/<pid>/cmdline or process listings
+    cmd = (str(binary_path), "--local", "--http-port=8081")
+    env = {
+        **os.environ,
+        "TELEGRAM_API_ID": str(api_id),
+        "TELEGRAM_API_HASH": str(api_hash),
+    }
+
     try:
-        process = subprocess.Popen(cmd)
-        # Give the server a moment to start
-        time.sleep(3)
-        
-        if check_local_api_server():
+        # Send server output to a log file instead of interleaving it with
+        # the bot's console output, and give the server its own session so a
+        # Ctrl-C to this script cannot race-kill it mid-request. No
+        # preexec_fn is passed, so CPython spawns via vfork and skips
+        # duplicating this process's page tables.
+        log_path = Path("telegram-bot-api.log")
+        with open(log_path, "ab") as log_file:
+            process = subprocess.Popen(
+                cmd,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True,
+            )
+
+        # Poll until the server answers instead of sleeping a fixed amount
+        if _wait_ready():
             print("✅ Local API server is running!")
             return process
         else:
             print("❌ Failed to start local API server")
+            process.kill()
+            # Show the tail of the server log for diagnosis
+            try:
+                tail = log_path.read_bytes()[-4096:]
+                if tail:
+                    print(f"Server log tail:\n{tail.decode(errors='replace')}")
+            except OSError:
+                pass
             return None
     except Exception as e:
         print(f"❌ Error starting local API server: {e}")
@@ -169,11 +269,13 @@ def run_local_api_server(api_id=None, api_hash=None):
 def run_bot():
     """Run the Telegram Download Bot"""
     print("🤖 Starting Telegram Download Bot...")
-    
+
     try:
-        # Run the bot using the Python interpreter
-        result = subprocess.run([sys.executable, "telegram_download_bot.py"])
-        return result.returncode == 0
+        # Run in-process instead of paying a second interpreter startup and
+        # re-importing the telegram SDK in a child process
+        from telegram_download_bot import main as bot_main
+        bot_main()
+        return True
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
         return True
@@ -189,14 +291,34 @@ def setup_config(api_id=None, api_hash=None, use_local_api=False):
         "local_api_url": "http://localhost:8081",
         "official_api_url": "https://api.telegram.org"
     }
-    
-    with open("api_config.json", "w") as f:
-        json.dump(config, f, indent=2)
-    
+
+    # Only touch the file when the content actually changes, so repeated
+    # calls during one startup cost a read instead of a write
+    new_content = json.dumps(config, indent=2).encode()
+    try:
+        old_content = Path("api_config.json").read_bytes()
+    except FileNotFoundError:
+        old_content = b""
+    if new_content != old_content:
+        # Write via a temp file and rename so a crash mid-write cannot leave
+        # a torn api_config.json behind
+        tmp_path = Path("api_config.json.tmp")
+        tmp_path.write_bytes(new_content)
+        os.replace(tmp_path, "api_config.json")
+
     print(f"⚙️  API configuration updated: use_local_api = {use_local_api}")
 
 
+def _handle_sigterm(signum, frame):
+    """Translate SIGTERM (container shutdown) into KeyboardInterrupt"""
+    raise KeyboardInterrupt
+
+
 def main():
+    # Route SIGTERM through the same cleanup paths as Ctrl-C so the API
+    # server is reaped promptly instead of being orphaned to PID 1
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
     parser = argparse.ArgumentParser(description="Deploy and manage Telegram File Download Bot")
     parser.add_argument("--bot-token", help="Telegram bot token")
     parser.add_argument("--api-id", help="Telegram API ID from my.telegram.org")
@@ -212,22 +334,29 @@ def main():
     if args.bot_token:
         os.environ["BOT_TOKEN"] = args.bot_token
     
-    # Install dependencies
-    if not install_dependencies():
+    use_local = args.use_local_api or (args.api_id and args.api_hash)
+
+    # Install dependencies and fetch the API server concurrently; both are
+    # I/O-bound and touch disjoint paths (site-packages vs telegram-bot-api/)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        deps_future = executor.submit(install_dependencies)
+        api_future = executor.submit(download_telegram_api_server) if use_local else None
+        deps_ok = deps_future.result()
+        api_ok = api_future.result() if api_future else True
+
+    if not deps_ok:
         print("❌ Failed to install dependencies. Exiting.")
         sys.exit(1)
-    
-    # If only setting up, download the API server and exit
+
+    # If only setting up, report the API-server result and exit
     if args.setup_only:
-        if args.use_local_api:
-            if not download_telegram_api_server():
-                print("❌ Failed to download Telegram Bot API server")
-                sys.exit(1)
+        if use_local and not api_ok:
+            print("❌ Failed to download Telegram Bot API server")
+            sys.exit(1)
         print("✅ Setup completed!")
         return
-    
+
     # Configure API settings
-    use_local = args.use_local_api or (args.api_id and args.api_hash)
     setup_config(args.api_id, args.api_hash, use_local)
     
     # If running only the bot
@@ -260,21 +389,28 @@ def main():
         if not api_process:
             print("❌ Failed to start local API server, falling back to official API")
             setup_config(args.api_id, args.api_hash, False)  # Switch to official API
-        else:
-            print("⏳ Waiting for API server to be ready...")
-            time.sleep(5)  # Give the server time to fully initialize
-    
+        # On success, run_local_api_server already polled the server to
+        # readiness; no further wait is needed before starting the bot
+
     # Run the bot
     try:
         run_bot()
     except KeyboardInterrupt:
         print("\n🛑 Stopping services...")
     finally:
-        # Clean up API server process if it was started
+        # Clean up API server process if it was started; escalate to kill
+        # if it does not exit within the grace period
         if api_process:
             api_process.terminate()
+            try:
+                api_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                api_process.kill()
             print("🛑 API server stopped")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        _HTTP.close()
\ No newline at end of file
@@ -10,24 +10,35 @@ import os
 import sys
 import subprocess
 import platform
+import signal
+import socket
 import time
+import json
+import shutil
 import requests
-import signal
-import argparse
 from pathlib import Path
-import json
-import asyncio
-import threading
-from telegram_download_bot import main as run_bot
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# OS detection is constant for the process; compute it once at import
+_OS = platform.system().lower()
+_IS_WINDOWS = _OS == "windows"
+_BINARY_NAME = "telegram-bot-api.exe" if _IS_WINDOWS else "telegram-bot-api"
+
+# Shared HTTP session so repeated GitHub API calls and health-check polls
+# reuse the same pooled TCP/TLS connections instead of reconnecting each time
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+))
+_HTTP.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
 
 def build_telegram_api_server():
     """Build the Telegram Bot API server from source"""
-    import subprocess
-    import os
-
     # Determine OS
-    os_name = platform.system().lower()
+    os_name = _OS
 
     if os_name != "linux":
         print(f"❌ Building from source is only supported on Linux. Current OS: {os_name}")
@@ -43,12 +54,9 @@ def build_telegram_api_server():
     binary_path = api_path / "inst" / "bin" / "telegram-bot-api"
     if binary_path.exists():
         print("✅ Telegram Bot API server already built!")
-        # Copy to expected location
+        # Hard-link to expected location; no need to duplicate ~30 MB
         expected_path = Path("telegram-bot-api") / "bin" / "telegram-bot-api"
-        expected_path.parent.mkdir(parents=True, exist_ok=True)
-        import shutil
-        shutil.copy2(binary_path, expected_path)
-        expected_path.chmod(0o755)
+        _link_or_copy(binary_path, expected_path)
         return True
 
     try:
@@ -57,8 +65,12 @@ def build_telegram_api_server():
         source_dir = api_path
 
         print("📦 Cloning telegram-bot-api repository...")
+        # Shallow clone: only the tip of the repo and its submodules is
+        # needed for a build, not hundreds of MB of history
         result = subprocess.run([
-            "git", "clone", "--recursive", "https://github.com/tdlib/telegram-bot-api.git", str(source_dir)
+            "git", "clone", "--depth=1", "--shallow-submodules", "--recurse-submodules",
+            "-c", "advice.detachedHead=false",
+            "https://github.com/tdlib/telegram-bot-api.git", str(source_dir)
         ], capture_output=True, text=True, timeout=300)  # 5 minute timeout
 
         if result.returncode != 0:
@@ -69,32 +81,34 @@ def build_telegram_api_server():
         build_dir.mkdir(exist_ok=True)
 
         print("⚙️ Running cmake configuration...")
-        result = subprocess.run([
-            "cmake", "-DCMAKE_BUILD_TYPE=Release", "-DCMAKE_INSTALL_PREFIX=../inst", ".."
-        ], cwd=build_dir, capture_output=True, text=True, timeout=300)
+        configure_cmd = ["cmake", "-DCMAKE_BUILD_TYPE=Release", "-DCMAKE_INSTALL_PREFIX=../inst"]
+        if shutil.which("ninja"):
+            configure_cmd += ["-G", "Ninja"]
+        configure_cmd.append("..")
+        result = subprocess.run(configure_cmd, cwd=build_dir, capture_output=True, text=True, timeout=300)
 
         if result.returncode != 0:
             print(f"❌ CMake configuration failed: {result.stderr}")
             return False
 
         print("🏗️ Building the project...")
+        # Build with one job per core and stream the output live instead of
+        # buffering the whole build log in memory
+        jobs = os.cpu_count() or 2
         result = subprocess.run([
-            "cmake", "--build", ".", "--target", "install"
-        ], cwd=build_dir, capture_output=True, text=True, timeout=1800)  # 30 minute timeout
+            "cmake", "--build", ".", "--parallel", str(jobs), "--target", "install"
+        ], cwd=build_dir, timeout=1800)  # 30 minute timeout
 
         if result.returncode != 0:
-            print(f"❌ Build failed: {result.stderr}")
+            print(f"❌ Build failed with exit code {result.returncode}")
             return False
 
         print("✅ Build completed successfully!")
 
-        # Copy to expected location
+        # Hard-link to expected location; no need to duplicate ~30 MB
         expected_path = Path("telegram-bot-api") / "bin" / "telegram-bot-api"
-        expected_path.parent.mkdir(parents=True, exist_ok=True)
-        import shutil
         if binary_path.exists():
-            shutil.copy2(binary_path, expected_path)
-            expected_path.chmod(0o755)
+            _link_or_copy(binary_path, expected_path)
             print(f"✅ Telegram Bot API server installed to: {expected_path}")
             return True
         else:
@@ -109,12 +123,102 @@ def build_telegram_api_server():
         return False
 
 
+def _extract_api_binary(tar_ref, bin_dir):
+    """Extract the telegram-bot-api member from an open tarfile into bin_dir"""
+    for member in tar_ref:
+        if member.isfile() and Path(member.name).name == "telegram-bot-api":
+            member.name = "telegram-bot-api"
+            # data filter: refuse absolute paths, traversal and device nodes
+            tar_ref.extract(member, path=bin_dir, filter="data")
+            return True
+    return False
+
+
+_RELEASE_URL = "https://api.github.com/repos/tdlib/telegram-bot-api/releases/latest"
+_RELEASE_CACHE_TTL = 3600  # seconds
+
+
+def _write_release_cache(cache_path, data):
+    """Write the release cache atomically so a crash cannot tear it"""
+    cache_path.parent.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, cache_path)
+
+
+def _get_latest_release_cached():
+    """Fetch the latest release JSON, reusing a cached copy via TTL and ETag"""
+    cache_path = Path("telegram-bot-api") / ".release_cache.json"
+    try:
+        cached = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cached = None
+
+    # Fresh enough: skip the network round-trip entirely
+    if cached and time.time() - cached.get("fetched_at", 0) < _RELEASE_CACHE_TTL:
+        return cached["release"]
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    try:
+        response = _HTTP.get(_RELEASE_URL, headers=headers, timeout=5)
+    except requests.exceptions.RequestException:
+        return cached["release"] if cached else None
+
+    if response.status_code == 304 and cached:
+        # Unchanged upstream; just refresh the TTL
+        cached["fetched_at"] = time.time()
+        _write_release_cache(cache_path, cached)
+        return cached["release"]
+
+    if response.status_code != 200:
+        # Serve a stale cache rather than failing outright
+        return cached["release"] if cached else None
+
+    cached = {
+        "etag": response.headers.get("ETag"),
+        "fetched_at": time.time(),
+        "release": response.json(),
+    }
+    _write_release_cache(cache_path, cached)
+    return cached["release"]
+
+
+def _release_cache_dir(tag):
+    """Persistent cache directory for the extracted binary of one release tag"""
+    cache_root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return cache_root / "telegram-bot-api" / tag
+
+
+def _verify_digest(path, expected):
+    """Check a downloaded file against the release asset's sha256 digest"""
+    if not expected or not expected.startswith("sha256:"):
+        # Nothing to verify against (older releases omit the digest field)
+        return True
+    import hashlib
+    with open(path, "rb") as f:
+        actual = hashlib.file_digest(f, "sha256").hexdigest()
+    return actual == expected.split(":", 1)[1]
+
+
+def _link_or_copy(src, dest):
+    """Hard-link src to dest, falling back to a real copy across devices"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+    dest.chmod(0o755)
+
+
 def download_telegram_api_server():
     """Download or build the Telegram Bot API server if not already present"""
-    import subprocess
-
     # Determine OS and architecture
-    os_name = platform.system().lower()
+    os_name = _OS
 
     print(f"📦 Setting up Telegram Bot API server for {os_name}...")
 
@@ -137,17 +241,30 @@ def download_telegram_api_server():
             print("⚠️ Building from source failed, trying download approach...")
 
     # Construct download URL based on OS
+    release_tag = None
+    asset_content_type = None
+    asset_digest = None
     if os_name == "windows":
         url = "https://github.com/tdlib/telegram-bot-api/releases/latest/download/telegram-bot-api-windows.zip"
         binary_name = "telegram-bot-api.exe"
     elif os_name == "linux":
         # Try to get the correct Linux binary from GitHub releases
         try:
-            import requests
-            # Get the latest release info from GitHub
-            response = requests.get("https://api.github.com/repos/tdlib/telegram-bot-api/releases/latest")
-            if response.status_code == 200:
-                release = response.json()
+            # Get the latest release info from GitHub (cached with ETag/TTL)
+            release = _get_latest_release_cached()
+            if release is not None:
+                release_tag = release.get("tag_name")
+
+                # Reuse a previously extracted binary for this release, so a
+                # wiped workdir (typical on redeploys) costs a link instead of
+                # a full re-download and extraction
+                if release_tag:
+                    cached_binary = _release_cache_dir(release_tag) / "telegram-bot-api"
+                    if cached_binary.exists():
+                        _link_or_copy(cached_binary, binary_path)
+                        print(f"✅ Reusing cached Telegram Bot API server ({release_tag})")
+                        return True
+
                 # Find the asset for Linux
                 assets = release.get("assets", [])
                 linux_asset = None
@@ -158,6 +275,8 @@ def download_telegram_api_server():
                         "static" in asset_name_lower and
                         "tar.gz" in asset_name_lower):
                         linux_asset = asset["browser_download_url"]
+                        asset_content_type = asset.get("content_type")
+                        asset_digest = asset.get("digest")
                         break
 
                 # If no static build found, try to find any linux binary
@@ -166,6 +285,8 @@ def download_telegram_api_server():
                         asset_name_lower = asset["name"].lower()
                         if "linux" in asset_name_lower and not "debug" in asset_name_lower:
                             linux_asset = asset["browser_download_url"]
+                            asset_content_type = asset.get("content_type")
+                            asset_digest = asset.get("digest")
                             break
 
                 if linux_asset:
@@ -199,7 +320,6 @@ def download_telegram_api_server():
         return True
 
     try:
-        import urllib.request
         import zipfile
         import tarfile
 
@@ -216,59 +336,128 @@ def download_telegram_api_server():
 
         download_path = api_path / f"telegram-api-{os_name}{download_ext}"
         print(f"Downloading from: {url}")
-        urllib.request.urlretrieve(url, download_path)
+
+        def _download():
+            # Stream through the pooled session in 1 MiB chunks instead of
+            # urlretrieve's fresh connection and small default buffer
+            head = b""
+            with _HTTP.get(url, stream=True, timeout=60, allow_redirects=True) as response:
+                response.raise_for_status()
+                size = int(response.headers.get("Content-Length", 0))
+                # buffering=0: we already write 1 MiB blocks, so the extra
+                # Python-level buffer layer is pure overhead
+                with open(download_path, "wb", buffering=0) as f:
+                    # Reserve contiguous extents up front so chunked writes
+                    # do not repeatedly extend the file (not on Windows)
+                    if size and hasattr(os, "posix_fallocate"):
+                        os.posix_fallocate(f.fileno(), 0, size)
+                    for chunk in response.iter_content(1 << 20):
+                        # Keep the magic bytes so classification below never
+                        # needs to reopen the file
+                        if not head:
+                            head = chunk[:8]
+                        f.write(chunk)
+            return head
+
+        download_head = _download()
+        # Verify against the sha256 the release asset advertises; a corrupt
+        # download would otherwise persist on disk forever
+        if not _verify_digest(download_path, asset_digest):
+            print("⚠️ Downloaded file failed checksum verification, retrying once...")
+            download_path.unlink(missing_ok=True)
+            download_head = _download()
+            if not _verify_digest(download_path, asset_digest):
+                print("❌ Downloaded file failed checksum verification")
+                download_path.unlink(missing_ok=True)
+                return False
 
         # Extract the archive or handle the binary
         if os_name == "windows":
             with zipfile.ZipFile(download_path, 'r') as zip_ref:
                 zip_ref.extractall(api_path)
         else:
-            # For Linux and macOS, determine if the download is an archive or binary
-            if is_binary_file(download_path) and os_name != "windows":
+            # For Linux and macOS, decide archive vs raw binary from metadata
+            # we already have: the URL extension and the content type GitHub
+            # reported for the asset. Only read magic bytes as a last resort.
+            if download_ext:
+                is_binary = False
+            elif asset_content_type is not None:
+                is_binary = asset_content_type in ("application/octet-stream", "application/x-executable")
+            else:
+                is_binary = download_head.startswith((b'\x7fELF', b'MZ'))
+
+            if is_binary:
                 # If it's already a binary executable, copy it directly to the bin directory
                 bin_dir = api_path / "bin"
                 bin_dir.mkdir(exist_ok=True)
                 dest_path = bin_dir / "telegram-bot-api"  # Use standard name
-                import shutil
                 shutil.move(download_path, dest_path)
                 print(f"✅ Telegram Bot API server installed to: {dest_path}")
 
                 # Make it executable on Unix systems
                 dest_path.chmod(0o755)
 
+                # Keep a copy in the persistent cache for future redeploys
+                if release_tag:
+                    _link_or_copy(dest_path, _release_cache_dir(release_tag) / "telegram-bot-api")
+
                 return True
             else:
                 # It's an archive, so extract it
-                if download_ext == ".tar.gz":
-                    import tarfile
-                    with tarfile.open(download_path, 'r:gz') as tar_ref:
-                        tar_ref.extractall(api_path)
-                elif download_ext == ".tar.xz":
-                    import tarfile
-                    with tarfile.open(download_path, 'r:xz') as tar_ref:
-                        tar_ref.extractall(api_path)
-                elif download_ext == ".zip":
-                    with zipfile.ZipFile(download_path, 'r') as zip_ref:
-                        zip_ref.extractall(api_path)
-
-                # Find the binary file in the extracted content and move it to bin
                 bin_dir = api_path / "bin"
                 bin_dir.mkdir(exist_ok=True)
+                dest_path = bin_dir / "telegram-bot-api"
+
+                if download_ext == ".zip":
+                    # Extract just the binary member by exact name match
+                    # instead of unpacking the archive and walking the tree
+                    with zipfile.ZipFile(download_path, 'r') as zip_ref:
+                        member = next(
+                            (n for n in zip_ref.namelist() if Path(n).name == "telegram-bot-api"),
+                            None
+                        )
+                        if member is None:
+                            print(f"❌ Could not find telegram-bot-api binary in the archive")
+                            return False
+                        with zip_ref.open(member) as src, open(dest_path, "wb") as dst:
+                            shutil.copyfileobj(src, dst)
+                else:
+                    # Extract just the binary member instead of unpacking the
+                    # whole archive and walking the extracted tree afterwards
+                    if download_ext == ".tar.xz" and shutil.which("xz"):
+                        # Delegate xz decompression to the system binary with
+                        # threading; CPython's lzma is single-threaded and
+                        # CPU-bound. Streaming mode ('r|') lets the pipe
+                        # decompress concurrently with tar parsing.
+                        dec = subprocess.Popen(
+                            ["xz", "-dc", "-T0", str(download_path)],
+                            stdout=subprocess.PIPE,
+                        )
+                        try:
+                            with tarfile.open(fileobj=dec.stdout, mode="r|") as tar_ref:
+                                extracted = _extract_api_binary(tar_ref, bin_dir)
+                        finally:
+                            dec.stdout.close()
+                            dec.wait()
+                    else:
+                        # 'r:*' autodetects gzip/xz compression
+                        with tarfile.open(download_path, 'r:*') as tar_ref:
+                            extracted = _extract_api_binary(tar_ref, bin_dir)
+
+                    if not extracted:
+                        print(f"❌ Could not find telegram-bot-api binary in the archive")
+                        return False
 
-                # Look for the telegram-bot-api binary in the extracted files
-                for file_path in api_path.rglob("*"):
-                    if file_path.is_file() and "telegram-bot-api" in file_path.name and not file_path.name.endswith(('.tar.gz', '.zip', '.tar.xz')):
-                        dest_path = bin_dir / "telegram-bot-api"
-                        file_path.rename(dest_path)
-                        print(f"✅ Telegram Bot API server installed to: {dest_path}")
+                print(f"✅ Telegram Bot API server installed to: {dest_path}")
 
-                        # Make it executable on Unix systems
-                        dest_path.chmod(0o755)
+                # Make it executable on Unix systems
+                dest_path.chmod(0o755)
 
-                        return True
+                # Keep a copy in the persistent cache for future redeploys
+                if release_tag:
+                    _link_or_copy(dest_path, _release_cache_dir(release_tag) / "telegram-bot-api")
 
-                print(f"❌ Could not find telegram-bot-api binary in the extracted files")
-                return False
+                return True
 
         return True
     except Exception as e:
@@ -276,45 +465,27 @@ def download_telegram_api_server():
         return False
 
 
-def is_binary_file(file_path):
-    """Check if a file is a binary executable"""
-    try:
-        with open(file_path, 'rb') as f:
-            chunk = f.read(1024)
-            # Check for common binary file signatures (magic numbers)
-            if chunk.startswith(b'\x7fELF'):  # ELF (Linux Executable)
-                return True
-            if chunk.startswith(b'MZ'):       # DOS/Windows Executable
-                return True
-        return False
-    except:
-        return False
-
-
-def is_binary_file(file_path):
-    """Check if a file is a binary executable"""
-    try:
-        with open(file_path, 'rb') as f:
-            chunk = f.read(1024)
-            # Check for common binary file signatures (magic numbers)
-            if chunk.startswith(b'\x7fELF'):  # ELF (Linux Executable)
-                return True
-            if chunk.startswith(b'MZ'):       # DOS/Windows Executable
-                return True
-        return False
-    except:
-        return False
-
-
 def check_local_api_server():
     """Check if the local API server is running"""
+    # A plain TCP connect is enough for a liveness probe and costs well
+    # under a millisecond, versus a full HTTP request/response round-trip
     try:
-        response = requests.get("http://localhost:8081", timeout=5)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
+        with socket.create_connection(("127.0.0.1", 8081), timeout=0.2):
+            return True
+    except OSError:
         return False
 
 
+def _wait_ready(timeout=10.0, interval=0.1):
+    """Poll the local API server until it responds or the timeout expires"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if check_local_api_server():
+            return True
+        time.sleep(interval)
+    return False
+
+
 def run_local_api_server(api_id=None, api_hash=None):
     """Start the local Telegram Bot API server in a subprocess"""
     if not api_id or not api_hash:
@@ -324,13 +495,7 @@ def run_local_api_server(api_id=None, api_hash=None):
 
     # Check if the server binary exists
     api_path = Path("telegram-bot-api") / "bin"
-    if platform.system().lower() == "windows":
-        binary_name = "telegram-bot-api.exe"
-    else:
-        # For Pella, we assume Linux
-        binary_name = "telegram-bot-api"
-
-    binary_path = api_path / binary_name
+    binary_path = api_path / _BINARY_NAME
     if not binary_path.exists():
         print("❌ Telegram Bot API server not found. Attempting to download...")
         if not download_telegram_api_server():
@@ -339,33 +504,45 @@ def run_local_api_server(api_id=None, api_hash=None):
 
     print(f"🚀 Starting local Telegram Bot API server on port 8081...")
 
-    cmd = [
-        str(binary_path),
-        f"--api-id={api_id}",
-        f"--api-hash={api_hash}",
-        "--local",
-        "--http-port=8081"
-    ]
+    # Credentials go through the environment (the server reads
+    # TELEGRAM_API_ID/TELEGRAM_API_HASH) so the api_hash never shows up in
+    # /proc/<pid>/cmdline or process listings
+    cmd = (str(binary_path), "--local", "--http-port=8081")
+    env = {
+        **os.environ,
+        "TELEGRAM_API_ID": str(api_id),
+        "TELEGRAM_API_HASH": str(api_hash),
+    }
 
     try:
-        # On Linux (Pella), we need to handle the process differently
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        # Give the server a moment to start
-        time.sleep(5)
-
-        if check_local_api_server():
+        # Send server output to a log file: an undrained PIPE would block the
+        # server as soon as the 64 KiB kernel pipe buffer fills up. No
+        # preexec_fn is passed, so CPython spawns via vfork and skips
+        # duplicating this process's page tables.
+        log_path = Path("telegram-bot-api.log")
+        with open(log_path, "ab") as log_file:
+            process = subprocess.Popen(
+                cmd,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True,
+            )
+
+        # Poll until the server answers instead of sleeping a fixed amount
+        if _wait_ready():
             print("✅ Local API server is running!")
             return process
         else:
             print("❌ Failed to start local API server")
-            # Print any error messages from the process
+            process.kill()
+            # Show the tail of the server log for diagnosis
             try:
-                stdout, stderr = process.communicate(timeout=1)
-                print(f"Server stdout: {stdout.decode()}")
-                print(f"Server stderr: {stderr.decode()}")
-            except subprocess.TimeoutExpired:
-                process.kill()
+                tail = log_path.read_bytes()[-4096:]
+                if tail:
+                    print(f"Server log tail:\n{tail.decode(errors='replace')}")
+            except OSError:
+                pass
             return None
     except Exception as e:
         print(f"❌ Error starting local API server: {e}")
@@ -380,18 +557,35 @@ def setup_config(api_id=None, api_hash=None, use_local_api=False):
         "official_api_url": "https://api.telegram.org"
     }
 
-    with open("api_config.json", "w") as f:
-        json.dump(config, f, indent=2)
+    # Only touch the file when the content actually changes, so repeated
+    # calls during one startup cost a read instead of a write
+    new_content = json.dumps(config, indent=2).encode()
+    try:
+        old_content = Path("api_config.json").read_bytes()
+    except FileNotFoundError:
+        old_content = b""
+    if new_content != old_content:
+        # Write via a temp file and rename so a crash mid-write cannot leave
+        # a torn api_config.json behind
+        tmp_path = Path("api_config.json.tmp")
+        tmp_path.write_bytes(new_content)
+        os.replace(tmp_path, "api_config.json")
 
     print(f"⚙️  API configuration updated: use_local_api = {use_local_api}")
 
 
-def run_bot_with_local_api():
+def run_bot():
+    """Run the bot, importing its dependency graph only once it is needed"""
+    # Lazy import: the telegram SDK and aiohttp are the heaviest imports in
+    # this script and are pointless to load if startup fails before this
+    from telegram_download_bot import main as bot_main
+    bot_main()
+
+
+def run_bot_with_local_api(api_id, api_hash):
     """Run the bot with local API configuration"""
-    # Setup config to use local API
-    api_id = os.getenv("API_ID", os.getenv("TELEGRAM_API_ID"))
-    api_hash = os.getenv("API_HASH", os.getenv("TELEGRAM_API_HASH"))
-    
+    # Credentials are resolved once in main and passed down; re-reading the
+    # environment here would just duplicate that work
     if not api_id or not api_hash:
         print("⚠️  API credentials not found in environment variables.")
         print("Make sure you have set API_ID and API_HASH environment variables.")
@@ -411,9 +605,19 @@ def run_bot_with_local_api():
         return False
 
 
+def _handle_sigterm(signum, frame):
+    """Translate SIGTERM (container shutdown) into KeyboardInterrupt"""
+    raise KeyboardInterrupt
+
+
 def main():
     print("🚀 Starting Telegram Download Bot for Pella deployment")
     print("=====================================================")
+
+    # Pella sends SIGTERM on shutdown; route it through the same cleanup
+    # paths as Ctrl-C so the API server is reaped promptly instead of being
+    # orphaned until the runtime's kill grace period expires
+    signal.signal(signal.SIGTERM, _handle_sigterm)
     
     # Get credentials from environment variables
     api_id = os.getenv("API_ID", os.getenv("TELEGRAM_API_ID"))
@@ -447,18 +651,23 @@ def main():
             except KeyboardInterrupt:
                 print("\n🛑 Bot stopped by user")
         else:
-            print("⏳ Waiting for API server to be ready...")
-            time.sleep(5)  # Give the server time to fully initialize
+            # run_local_api_server already polled the server to readiness;
+            # no further wait is needed before starting the bot
 
             # Run the bot in the main thread
             try:
-                run_bot_with_local_api()
+                run_bot_with_local_api(api_id, api_hash)
             except KeyboardInterrupt:
                 print("\n🛑 Stopping services...")
             finally:
-                # Clean up API server process
+                # Clean up API server process; escalate to kill if it does
+                # not exit within the grace period
                 if api_process:
                     api_process.terminate()
+                    try:
+                        api_process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        api_process.kill()
                     print("🛑 API server stopped")
     else:
         # Run without local API server (using official API)
@@ -475,4 +684,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        _HTTP.close()
\ No newline at end of file
@@ -3,7 +3,8 @@ Telegram File Download Bot
 A robust bot for downloading and transferring large files (>4GB) from direct links.
 
 Dependencies:
-pip install python-telegram-bot aiohttp aiofiles validators
+pip install python-telegram-bot aiohttp
+pip install uvloop  # optional, not on Windows
 
 Usage:
 1. Set your bot token in the BOT_TOKEN variable or as environment variable
@@ -12,14 +13,18 @@ Usage:
 
 import os
 import asyncio
+import functools
 import logging
+import math
+import mmap
+import re
+import shutil
 import time
-import validators
 import aiohttp
-import aiofiles
+from dataclasses import dataclass
 from pathlib import Path
 from urllib.parse import urlparse, unquote
-from typing import Optional, Dict
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -46,94 +51,352 @@ import os
 # On Windows: set BOT_TOKEN=your_bot_token_here
 # On Linux/Mac: export BOT_TOKEN=your_bot_token_here
 BOT_TOKEN = os.getenv("BOT_TOKEN")  # Use environment variable only, no default
-DOWNLOAD_DIR = Path("downloads")
+
+
+def _pick_download_dir() -> Path:
+    """Choose the download directory, preferring tmpfs when enabled
+
+    With USE_TMPFS=1 and enough free space, files land in /dev/shm so the
+    write-then-read-back for upload never touches the disk at all.
+    """
+    if os.getenv("USE_TMPFS") == "1":
+        shm = Path("/dev/shm")
+        try:
+            if shm.is_dir() and shutil.disk_usage(shm).free > 4 * 1024 ** 3:
+                return shm / "tgdow"
+        except OSError:
+            pass
+    return Path("downloads")
+
+
+DOWNLOAD_DIR = _pick_download_dir()
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+# Files at or below this size are downloaded straight into memory and
+# uploaded from there, skipping one full disk write + read; larger files
+# still go through DOWNLOAD_DIR
+MEMORY_UPLOAD_THRESHOLD = 256 * 1024 * 1024  # 256MB
+
+# Files above this size are fetched over several ranged connections when
+# the server supports it, since one TCP stream rarely fills the pipe
+PARALLEL_THRESHOLD = 100 * 1024 * 1024  # 100MB
+PARALLEL_CONNECTIONS = 8
+
+# Telegram's bot upload cap: 2GB via the official API; raised to 4GB in
+# main() when a local Bot API server is configured
+MAX_TELEGRAM_SIZE = 2 * 1024 * 1024 * 1024
+
+# True when talking to a local Bot API server in local mode, in which case
+# on-disk files are sent by path and the server reads them directly
+_LOCAL_MODE = False
+
+# Cheap syntactic URL check; the HEAD probe that follows does the real
+# validation, so this only needs to reject obvious non-URLs quickly
+_URL_RE = re.compile(r'^https?://[^\s/$.?#].[^\s]*$', re.IGNORECASE)
+
+# At most this many downloads run at once across all users; extra requests
+# queue so active transfers keep full speed and file descriptors stay bounded
+DOWNLOAD_SEM = asyncio.BoundedSemaphore(5)
+
 # Conversation states
 WAITING_FOR_LINK, WAITING_FOR_FILENAME = range(2)
 
-# User session data
-user_sessions: Dict[int, dict] = {}
+@dataclass(slots=True)
+class UserSession:
+    """Per-user download state, stored in context.user_data
+
+    Living in PTB's user_data (instead of a module-level dict keyed by user
+    id) means abandoned conversations cannot leak entries forever.
+    """
+    url: str
+    original_filename: str
+    file_size: Optional[int]
+
+
+# Shared aiohttp session, created lazily on first use. Reusing one session
+# (and its connector) keeps DNS, TCP and TLS state warm across every probe
+# and download instead of handshaking from scratch per operation.
+_session: Optional[aiohttp.ClientSession] = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=30,
+                ttl_dns_cache=300
+            ),
+            # read_bufsize: let aiohttp buffer up to 10MB ahead of the
+            # consumer so each await can hand over megabytes instead of the
+            # 64KB default. auto_decompress off: payloads here are files
+            # (zip/mp4/iso...), so transparent gzip would only burn CPU and
+            # desync Content-Length.
+            read_bufsize=10 * 1024 * 1024,
+            auto_decompress=False,
+        )
+    return _session
+
+
+async def close_session(application) -> None:
+    """Close the shared aiohttp session (post_shutdown hook)"""
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+
+class _RangeNotSupported(Exception):
+    """Server answered a ranged GET with something other than 206"""
 
 
 class FileDownloader:
     """Handles file downloading with progress tracking"""
     
     @staticmethod
-    async def get_filename_from_url(url: str, session: aiohttp.ClientSession) -> Optional[str]:
-        """Extract filename from URL or Content-Disposition header"""
-        try:
-            # Try HEAD request first to get headers without downloading
-            async with session.head(url, allow_redirects=True, timeout=30) as response:
-                # Check Content-Disposition header
-                content_disposition = response.headers.get('Content-Disposition', '')
-                if 'filename=' in content_disposition:
-                    filename = content_disposition.split('filename=')[1].strip('"\'')
-                    return unquote(filename)
-                
-                # Extract from URL path
-                parsed_url = urlparse(str(response.url))
-                filename = Path(unquote(parsed_url.path)).name
-                
-                if filename and filename != '':
-                    return filename
-                
-                return None
-        except Exception as e:
-            logger.error(f"Error getting filename: {e}")
-            return None
-    
+    async def probe(url: str, session: aiohttp.ClientSession) -> dict:
+        """Collect status, headers and final URL with a single HEAD request"""
+        async with session.head(url, allow_redirects=True, timeout=30) as response:
+            return {
+                'status': response.status,
+                'content_type': response.headers.get('Content-Type', ''),
+                'content_disposition': response.headers.get('Content-Disposition', ''),
+                'content_length': response.headers.get('Content-Length', ''),
+                'final_url': str(response.url),
+            }
+
+    @staticmethod
+    def filename_from_probe(probe: dict) -> Optional[str]:
+        """Derive a filename from a probe result without extra requests"""
+        # Check Content-Disposition header
+        content_disposition = probe['content_disposition']
+        if 'filename=' in content_disposition:
+            filename = content_disposition.split('filename=')[1].strip('"\'')
+            return unquote(filename)
+
+        # Extract from the (post-redirect) URL path
+        parsed_url = urlparse(probe['final_url'])
+        filename = Path(unquote(parsed_url.path)).name
+        return filename or None
+
+
     @staticmethod
-    async def get_file_size(url: str, session: aiohttp.ClientSession) -> Optional[int]:
-        """Get file size from Content-Length header"""
+    async def download_to_memory(url: str, progress_callback=None) -> bytes:
+        """Download a small/medium file straight into memory"""
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=60,
+            sock_read=300
+        )
+
+        session = await get_session()
+        async with session.get(url, timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status}: Failed to download file")
+
+            total_size = int(response.headers.get('Content-Length', 0))
+            buf = bytearray()
+            chunk_size = 8 * 1024 * 1024
+            # ~50 callback invocations per file, not one per chunk
+            progress_every = max(1, (total_size // chunk_size) // 50)
+            chunks = 0
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                buf += chunk
+                chunks += 1
+
+                if (progress_callback and total_size > 0
+                        and chunks % progress_every == 0):
+                    progress = (len(buf) / total_size) * 100
+                    await progress_callback(len(buf), total_size, progress)
+
+        return bytes(buf)
+
+    @staticmethod
+    async def _download_ranges(url, filepath, total_size, progress_callback, timeout):
+        """Download a file over several concurrent ranged connections"""
+        session = await get_session()
+        part = total_size // PARALLEL_CONNECTIONS
+        downloaded = [0]  # Shared across workers; updates stay on the event loop
+        chunks = [0]
+        # ~50 callback invocations per file, not one per chunk
+        progress_every = max(1, (total_size // (8 * 1024 * 1024)) // 50)
+
+        # Preallocate the full file so each worker can pwrite into its own
+        # region without racing over a shared file position
+        fd = os.open(filepath, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            async with session.head(url, allow_redirects=True, timeout=30) as response:
-                return int(response.headers.get('Content-Length', 0))
-        except Exception as e:
-            logger.error(f"Error getting file size: {e}")
-            return None
-    
+            if hasattr(os, 'posix_fallocate'):
+                await asyncio.to_thread(os.posix_fallocate, fd, 0, total_size)
+
+            async def fetch(start, end):
+                headers = {'Range': f'bytes={start}-{end}'}
+                async with session.get(url, timeout=timeout, headers=headers) as response:
+                    if response.status != 206:
+                        # Some servers (CDNs especially) advertise ranges
+                        # but ignore them on GET; the caller degrades to
+                        # the single-stream path
+                        raise _RangeNotSupported(f"HTTP {response.status} to ranged request")
+
+                    pos = start
+                    while True:
+                        # Same 30s per-read cap as the single-stream path
+                        chunk = await asyncio.wait_for(
+                            response.content.read(8 * 1024 * 1024), timeout=30
+                        )
+                        if not chunk:
+                            break
+                        await asyncio.to_thread(os.pwrite, fd, chunk, pos)
+                        pos += len(chunk)
+                        downloaded[0] += len(chunk)
+                        chunks[0] += 1
+
+                        if progress_callback and chunks[0] % progress_every == 0:
+                            progress = (downloaded[0] / total_size) * 100
+                            await progress_callback(downloaded[0], total_size, progress)
+
+            tasks = []
+            for i in range(PARALLEL_CONNECTIONS):
+                start = i * part
+                end = total_size - 1 if i == PARALLEL_CONNECTIONS - 1 else start + part - 1
+                tasks.append(asyncio.create_task(fetch(start, end)))
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # gather does not cancel the other workers when one fails;
+                # stop and await them all so none is still pwrite-ing into
+                # the fd when it is truncated and closed below
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        except BaseException:
+            # The preallocated file is full-size but has holes; truncate so
+            # the Range-resume logic cannot mistake it for a complete file
+            os.ftruncate(fd, 0)
+            raise
+        finally:
+            os.close(fd)
+
     @staticmethod
     async def download_file(
         url: str,
         filename: str,
         progress_callback=None
     ) -> Path:
-        """Download file with progress tracking"""
+        """Download file with progress tracking and HTTP Range resume"""
         filepath = DOWNLOAD_DIR / filename
-        
-        # Configure timeout: no total timeout, but keep connection alive
+
+        # No socket-level read timeout: each read is individually capped
+        # with wait_for below, so one stalled chunk costs 30s, not the
+        # whole transfer
         timeout = aiohttp.ClientTimeout(
             total=None,  # No total timeout
             connect=60,  # 60s to establish connection
-            sock_read=300  # 5 minutes between chunks
+            sock_read=None
         )
-        
-        connector = aiohttp.TCPConnector(
-            limit=100,
-            limit_per_host=30,
-            ttl_dns_cache=300
-        )
-        
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            async with session.get(url, timeout=timeout) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP {response.status}: Failed to download file")
-                
-                total_size = int(response.headers.get('Content-Length', 0))
-                downloaded = 0
-                chunk_size = 1024 * 1024  # 1MB chunks
-                
-                async with aiofiles.open(filepath, 'wb') as f:
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        await f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if progress_callback and total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            await progress_callback(downloaded, total_size, progress)
-        
-        return filepath
+
+        session = await get_session()
+        max_attempts = 3
+        attempt = 0
+        # os.pwrite is Unix-only; on Windows large files stay single-stream
+        use_parallel = hasattr(os, 'pwrite')
+
+        while True:
+            attempt += 1
+
+            # Resume from whatever a previous attempt left on disk instead
+            # of re-fetching bytes we already have
+            offset = filepath.stat().st_size if filepath.exists() else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            downloaded = offset
+
+            try:
+                async with session.get(url, timeout=timeout, headers=headers) as response:
+                    if offset and response.status == 206:
+                        mode = 'ab'
+                    elif response.status == 200:
+                        # Server ignored the Range header; restart from zero
+                        mode = 'wb'
+                        offset = 0
+                    else:
+                        raise Exception(f"HTTP {response.status}: Failed to download file")
+
+                    # On 206 Content-Length only covers the remaining suffix
+                    total_size = offset + int(response.headers.get('Content-Length', 0))
+
+                    # Large file on a range-capable server: drop this single
+                    # stream and fetch N ranges concurrently instead
+                    if (use_parallel
+                            and not offset
+                            and total_size > PARALLEL_THRESHOLD
+                            and response.headers.get('Accept-Ranges', '').lower() == 'bytes'):
+                        response.close()
+                        try:
+                            await FileDownloader._download_ranges(
+                                url, filepath, total_size, progress_callback, timeout
+                            )
+                            return filepath
+                        except _RangeNotSupported:
+                            # The server ignored our Range despite its
+                            # Accept-Ranges header; redo this attempt as a
+                            # plain single-stream download
+                            use_parallel = False
+                            attempt -= 1
+                            continue
+
+                    downloaded = offset
+                    # 8MB chunks: 8x fewer loop iterations, syscalls and
+                    # progress-callback invocations per GB than 1MB chunks
+                    chunk_size = 8 * 1024 * 1024
+                    # ~50 callback invocations per file, not one per chunk
+                    progress_every = max(1, (total_size // chunk_size) // 50)
+                    chunks = 0
+
+                    # Plain file + to_thread beats aiofiles here: one thread
+                    # dispatch per chunk write instead of aiofiles' per-call
+                    # executor round-trips, and buffering=0 skips the extra
+                    # Python-level buffer copy for these already-large chunks
+                    with open(filepath, mode, buffering=0) as f:
+                        # Reserve the full extent up front so chunked writes
+                        # never extend the file; keeps multi-GB files
+                        # contiguous and skips per-write metadata updates
+                        if total_size and mode == 'wb' and hasattr(os, 'posix_fallocate'):
+                            await asyncio.to_thread(
+                                os.posix_fallocate, f.fileno(), 0, total_size
+                            )
+                        while True:
+                            # Cap each read at 30s: a stall aborts only
+                            # this read, and the outer loop reconnects and
+                            # resumes from the current offset
+                            chunk = await asyncio.wait_for(
+                                response.content.read(chunk_size), timeout=30
+                            )
+                            if not chunk:
+                                break
+                            await asyncio.to_thread(f.write, chunk)
+                            downloaded += len(chunk)
+                            chunks += 1
+
+                            if (progress_callback and total_size > 0
+                                    and chunks % progress_every == 0):
+                                progress = (downloaded / total_size) * 100
+                                await progress_callback(downloaded, total_size, progress)
+
+                return filepath
+            except (aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                # Network blip mid-transfer: retry, resuming from the bytes
+                # already written rather than restarting the whole file
+                if attempt >= max_attempts:
+                    raise
+                # Trim the preallocated-but-unwritten tail so the next
+                # attempt's Range offset points at real data
+                if filepath.exists():
+                    os.truncate(filepath, downloaded)
+                logger.warning(
+                    f"Download interrupted ({type(e).__name__}), "
+                    f"resuming (attempt {attempt + 1}/{max_attempts})"
+                )
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -156,42 +419,36 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await start(update, context)
 
 
-async def validate_link(url: str) -> tuple[bool, str]:
-    """Validate if URL is a valid direct download link"""
-    # Basic URL validation
-    if not validators.url(url):
-        return False, "❌ Invalid URL format. Please provide a valid URL."
-    
-    # Check if it's HTTP/HTTPS
-    if not url.startswith(('http://', 'https://')):
-        return False, "❌ URL must start with http:// or https://"
-    
+async def validate_link(url: str) -> tuple[bool, str, Optional[dict]]:
+    """Validate a direct download link with a single HEAD request
+
+    Returns (is_valid, message, probe); the probe dict carries the response
+    headers so callers never repeat the HEAD for filename or size.
+    """
+    # Basic URL validation (the regex also guarantees an http(s) scheme)
+    if not _URL_RE.match(url):
+        return False, "❌ Invalid URL format. Please provide a valid URL.", None
+
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url, allow_redirects=True, timeout=30) as response:
-                # Check if URL is accessible
-                if response.status >= 400:
-                    return False, f"❌ URL returned error code: {response.status}"
-                
-                # Check if it's a direct download (has content-length or content-disposition)
-                content_type = response.headers.get('Content-Type', '')
-                content_disposition = response.headers.get('Content-Disposition', '')
-                content_length = response.headers.get('Content-Length', '')
-                
-                # If it has Content-Disposition or Content-Length, it's likely a direct link
-                if content_disposition or content_length:
-                    return True, "✅ Valid direct download link!"
-                
-                # Check if content-type is not HTML (likely a file)
-                if 'text/html' not in content_type.lower():
-                    return True, "✅ Valid direct download link!"
-                
-                return False, "❌ This doesn't appear to be a direct download link. It may be a web page."
-                
+        probe = await FileDownloader.probe(url, await get_session())
     except asyncio.TimeoutError:
-        return False, "❌ Connection timeout. Please check the URL and try again."
+        return False, "❌ Connection timeout. Please check the URL and try again.", None
     except Exception as e:
-        return False, f"❌ Error validating link: {str(e)}"
+        return False, f"❌ Error validating link: {str(e)}", None
+
+    # Check if URL is accessible
+    if probe['status'] >= 400:
+        return False, f"❌ URL returned error code: {probe['status']}", None
+
+    # If it has Content-Disposition or Content-Length, it's likely a direct link
+    if probe['content_disposition'] or probe['content_length']:
+        return True, "✅ Valid direct download link!", probe
+
+    # Check if content-type is not HTML (likely a file)
+    if 'text/html' not in probe['content_type'].lower():
+        return True, "✅ Valid direct download link!", probe
+
+    return False, "❌ This doesn't appear to be a direct download link. It may be a web page.", None
 
 
 async def download_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -205,57 +462,55 @@ async def download_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 async def handle_link(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle direct link submission"""
-    user_id = update.effective_user.id
     url = update.message.text.strip()
     
     # Send validation message
     status_msg = await update.message.reply_text("🔍 Validating link...")
     
-    # Validate the link
-    is_valid, message = await validate_link(url)
-    
+    # Validate the link; the returned probe already holds the headers
+    is_valid, message, probe = await validate_link(url)
+
     if not is_valid:
         await status_msg.edit_text(message)
         return WAITING_FOR_LINK
-    
-    # Get filename and file size
+
+    # Derive filename and file size from the probe without further requests
     try:
-        async with aiohttp.ClientSession() as session:
-            downloader = FileDownloader()
-            filename = await downloader.get_filename_from_url(url, session)
-            file_size = await downloader.get_file_size(url, session)
-            
-            if not filename:
-                filename = "downloaded_file"
-            
-            # Store session data
-            user_sessions[user_id] = {
-                'url': url,
-                'original_filename': filename,
-                'file_size': file_size
-            }
-            
-            # Format file size
-            size_str = format_size(file_size) if file_size else "Unknown"
-            
-            # Create inline keyboard for options
-            keyboard = [
-                [InlineKeyboardButton("📄 Use Default Name", callback_data="default")],
-                [InlineKeyboardButton("✏️ Rename File", callback_data="rename")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await status_msg.edit_text(
-                f"✅ Link validated successfully!\n\n"
-                f"<b>File Name:</b> <code>{filename}</code>\n"
-                f"<b>File Size:</b> {size_str}\n\n"
-                f"Choose an option:",
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.HTML
-            )
-            
-            return WAITING_FOR_FILENAME
-            
+        filename = FileDownloader.filename_from_probe(probe)
+        file_size = int(probe['content_length'] or 0) or None
+
+        if not filename:
+            filename = "downloaded_file"
+
+        # Store session data; PTB scopes user_data per user and cleans it
+        # up with the conversation
+        context.user_data['session'] = UserSession(
+            url=url,
+            original_filename=filename,
+            file_size=file_size
+        )
+
+        # Format file size
+        size_str = format_size(file_size) if file_size else "Unknown"
+
+        # Create inline keyboard for options
+        keyboard = [
+            [InlineKeyboardButton("📄 Use Default Name", callback_data="default")],
+            [InlineKeyboardButton("✏️ Rename File", callback_data="rename")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+
+        await status_msg.edit_text(
+            f"✅ Link validated successfully!\n\n"
+            f"<b>File Name:</b> <code>{filename}</code>\n"
+            f"<b>File Size:</b> {size_str}\n\n"
+            f"Choose an option:",
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.HTML
+        )
+
+        return WAITING_FOR_FILENAME
+
     except Exception as e:
         await status_msg.edit_text(f"❌ Error: {str(e)}")
         return WAITING_FOR_LINK
@@ -266,23 +521,22 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
     
-    user_id = update.effective_user.id
-    session = user_sessions.get(user_id)
-    
+    session = context.user_data.get('session')
+
     if not session:
         await query.edit_message_text("❌ Session expired. Please start over with /download")
         return ConversationHandler.END
-    
+
     if query.data == "default":
         # Start download with original filename
         status_msg = await query.edit_message_text("⏳ Starting download...")
-        await start_download(update, context, session['original_filename'], status_msg)
+        await start_download(update, context, session.original_filename, status_msg)
         return ConversationHandler.END
-    
+
     elif query.data == "rename":
         # Ask for new filename
         await query.edit_message_text(
-            f"✏️ Current filename: <code>{session['original_filename']}</code>\n\n"
+            f"✏️ Current filename: <code>{session.original_filename}</code>\n\n"
             f"Please send the new filename (with extension):",
             parse_mode=ParseMode.HTML
         )
@@ -291,8 +545,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def handle_rename(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle filename rename"""
-    user_id = update.effective_user.id
-    session = user_sessions.get(user_id)
+    session = context.user_data.get('session')
     
     if not session:
         await update.message.reply_text("❌ Session expired. Please start over with /download")
@@ -311,6 +564,44 @@ async def handle_rename(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return ConversationHandler.END
 
 
+_SPINNER_FRAMES = ("⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏")
+
+
+async def animate_upload_progress(status_msg, file_size, start_time):
+    """Edit the upload status message every 10s until cancelled"""
+    frame_idx = 0
+    while True:
+        # Sleep straight through to the next edit instead of waking every
+        # couple of seconds just to check a clock
+        await asyncio.sleep(10)
+        frame_idx += 1
+
+        elapsed = int(asyncio.get_event_loop().time() - start_time)
+        minutes, seconds = divmod(elapsed, 60)
+
+        try:
+            await status_msg.edit_text(
+                f"📤 <b>Uploading to Telegram...</b>\n\n"
+                f"{_SPINNER_FRAMES[frame_idx % len(_SPINNER_FRAMES)]} <b>In Progress</b>\n\n"
+                f"📦 Size: {format_size(file_size)}\n"
+                f"⏱️ Time: {minutes:02d}:{seconds:02d}\n\n"
+                f"⏳ Please wait, do not close the bot...",
+                parse_mode=ParseMode.HTML
+            )
+        except Exception as e:
+            # Log the error but continue
+            logger.warning(f"Failed to update progress message: {e}")
+
+
+async def _cancel_task(task):
+    """Cancel a background task and wait for it to finish"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
 async def start_download(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -318,308 +609,319 @@ async def start_download(
     status_msg=None
 ) -> None:
     """Start the file download and upload process"""
-    user_id = update.effective_user.id
-    session = user_sessions.get(user_id)
-    
+    session = context.user_data.get('session')
+
     if not session:
         return
-    
-    url = session['url']
+
+    url = session.url
     filepath = None
     
-    try:
-        # Progress callback for download
-        last_progress = [0]  # Track last progress update
-        last_update_time = [0]  # Track last update time
-
-        async def progress_callback(downloaded, total, progress):
-            current_time = time.time()
-            current_progress = int(progress)
-
-            # Update more frequently: every 2% or every 5 seconds
-            should_update = False
+    # Tell the user they are queued when every download slot is busy
+    if DOWNLOAD_SEM.locked() and status_msg:
+        try:
+            await status_msg.edit_text("⏳ Queued, waiting for a download slot...")
+        except Exception:
+            pass
 
-            if total > 0:  # If we know the total size
-                # Update every 2% at minimum
-                progress_step = (current_progress // 2) * 2
-                if progress_step != last_progress[0] and progress_step >= 2:
-                    should_update = True
-                    last_progress[0] = progress_step
-            else:  # If total size is unknown, update more frequently based on data downloaded
-                if downloaded > (last_progress[0] + 10 * 1024 * 1024):  # Every 10MB
+    async with DOWNLOAD_SEM:
+        try:
+            # Progress callback for download
+            last_progress = [0]  # Track last progress update
+            last_update_time = [0]  # Track last update time
+
+            async def progress_callback(downloaded, total, progress):
+                current_time = time.time()
+                current_progress = int(progress)
+
+                # Update more frequently: every 2% or every 5 seconds
+                should_update = False
+
+                if total > 0:  # If we know the total size
+                    # Update every 2% at minimum
+                    progress_step = (current_progress // 2) * 2
+                    if progress_step != last_progress[0] and progress_step >= 2:
+                        should_update = True
+                        last_progress[0] = progress_step
+                else:  # If total size is unknown, update more frequently based on data downloaded
+                    if downloaded > (last_progress[0] + 10 * 1024 * 1024):  # Every 10MB
+                        should_update = True
+                        last_progress[0] = downloaded
+
+                # Also update if enough time has passed (5 seconds) to ensure UI responsiveness
+                if current_time - last_update_time[0] >= 5:
                     should_update = True
-                    last_progress[0] = downloaded
-
-            # Also update if enough time has passed (5 seconds) to ensure UI responsiveness
-            if current_time - last_update_time[0] >= 5:
-                should_update = True
-                if total > 0:
-                    last_progress[0] = current_progress  # Update to current progress to avoid duplicate updates
-                else:
-                    last_progress[0] = downloaded
-
-            if should_update:
-                last_update_time[0] = current_time
-                size_downloaded = format_size(downloaded)
-                size_total = format_size(total) if total > 0 else "Unknown"
-
-                # Create animated progress bar
-                if total > 0:
-                    progress_bar = create_progress_bar(current_progress)
-                    progress_text = f"{current_progress}%"
-                else:
-                    progress_bar = create_progress_bar(0)  # Show empty bar when total is unknown
-                    progress_text = "Unknown"
-
-                if status_msg:
-                    try:
-                        await status_msg.edit_text(
-                            f"⬇️ <b>Downloading...</b>\n\n"
-                            f"{progress_bar} {progress_text}\n\n"
-                            f"📦 {size_downloaded} / {size_total}",
-                            parse_mode=ParseMode.HTML
-                        )
-                    except Exception as e:
-                        pass  # Ignore "message not modified" errors
-        
-        # Download file
-        downloader = FileDownloader()
-        filepath = await downloader.download_file(url, filename, progress_callback)
-        
-        # Get file size
-        file_size = filepath.stat().st_size
-        chat_id = update.effective_chat.id
-        
-        # Check Telegram's file size limit (2GB for bots)
-        MAX_TELEGRAM_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
-        
-        if file_size > MAX_TELEGRAM_SIZE:
-            error_msg = (
-                f"❌ <b>File exceeds Telegram's limit!</b>\n\n"
-                f"📦 <b>File size:</b> {format_size(file_size)}\n"
-                f"⚠️ <b>Telegram limit:</b> 2 GB\n\n"
-                f"💡 <b>Solutions:</b>\n"
-                f"• Use a file compression tool\n"
-                f"• Split the file into smaller parts\n"
-                f"• Upload to cloud storage (Google Drive, Mega, etc.)"
-            )
-            if status_msg:
-                await status_msg.edit_text(error_msg, parse_mode=ParseMode.HTML)
-            else:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=error_msg,
-                    parse_mode=ParseMode.HTML
-                )
-            return
-        
-        if status_msg:
-            await status_msg.edit_text(
-                f"📤 <b>Uploading to Telegram...</b>\n\n"
-                f"📦 {format_size(file_size)}\n"
-                f"⏳ Please wait, this may take several minutes...",
-                parse_mode=ParseMode.HTML
-            )
-        
-        # Upload with retry logic and progress animation
-        max_retries = 3
-        retry_count = 0
-        upload_success = False
-        upload_start_time = asyncio.get_event_loop().time()
-        
-        # Start upload progress animation task
-        upload_animation_task = None
-        animation_active = [True]  # Use list for mutable flag
-        
-        async def animate_upload_progress():
-            """Animate upload progress with a spinner"""
-            frames = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
-            frame_idx = 0
-            last_update = 0
-
-            while animation_active[0]:
-                elapsed = int(asyncio.get_event_loop().time() - upload_start_time)
-                minutes = elapsed // 60
-                seconds = elapsed % 60
-
-                # Update every 10 seconds to significantly reduce rate limiting issues
-                if elapsed - last_update >= 10:
-                    last_update = elapsed
-                    frame_idx = (frame_idx + 1) % len(frames)
+                    if total > 0:
+                        last_progress[0] = current_progress  # Update to current progress to avoid duplicate updates
+                    else:
+                        last_progress[0] = downloaded
+
+                if should_update:
+                    last_update_time[0] = current_time
+                    # Quantize to whole MB so the lru_cache on format_size
+                    # actually gets hits across progress updates
+                    size_downloaded = format_size((downloaded >> 20) << 20 or downloaded)
+                    size_total = format_size(total) if total > 0 else "Unknown"
+
+                    # Create animated progress bar
+                    if total > 0:
+                        progress_bar = create_progress_bar(current_progress)
+                        progress_text = f"{current_progress}%"
+                    else:
+                        progress_bar = create_progress_bar(0)  # Show empty bar when total is unknown
+                        progress_text = "Unknown"
 
                     if status_msg:
                         try:
                             await status_msg.edit_text(
-                                f"📤 <b>Uploading to Telegram...</b>\n\n"
-                                f"{frames[frame_idx]} <b>In Progress</b>\n\n"
-                                f"📦 Size: {format_size(file_size)}\n"
-                                f"⏱️ Time: {minutes:02d}:{seconds:02d}\n\n"
-                                f"⏳ Please wait, do not close the bot...",
+                                f"⬇️ <b>Downloading...</b>\n\n"
+                                f"{progress_bar} {progress_text}\n\n"
+                                f"📦 {size_downloaded} / {size_total}",
                                 parse_mode=ParseMode.HTML
                             )
                         except Exception as e:
-                            # Log the error but continue
-                            logger.warning(f"Failed to update progress message: {e}")
-
-                await asyncio.sleep(2)  # Sleep longer between checks to reduce resource usage
+                            pass  # Ignore "message not modified" errors
         
-        while retry_count < max_retries and not upload_success:
-            try:
-                # Start animation task
+            # Download file. Small/medium files stream straight into memory so
+            # their bytes never hit disk at all; large files keep the on-disk
+            # path to bound memory use.
+            downloader = FileDownloader()
+            file_data = None
+            expected_size = session.file_size
+            if expected_size and expected_size <= MEMORY_UPLOAD_THRESHOLD:
+                file_data = await downloader.download_to_memory(url, progress_callback)
+                file_size = len(file_data)
+            else:
+                filepath = await downloader.download_file(url, filename, progress_callback)
+                file_size = filepath.stat().st_size
+            chat_id = update.effective_chat.id
+        
+            # Check Telegram's file size limit (2GB, or 4GB on a local server)
+            if file_size > MAX_TELEGRAM_SIZE:
+                error_msg = (
+                    f"❌ <b>File exceeds Telegram's limit!</b>\n\n"
+                    f"📦 <b>File size:</b> {format_size(file_size)}\n"
+                    f"⚠️ <b>Telegram limit:</b> {format_size(MAX_TELEGRAM_SIZE)}\n\n"
+                    f"💡 <b>Solutions:</b>\n"
+                    f"• Use a file compression tool\n"
+                    f"• Split the file into smaller parts\n"
+                    f"• Upload to cloud storage (Google Drive, Mega, etc.)"
+                )
                 if status_msg:
-                    animation_active[0] = True
-                    upload_animation_task = asyncio.create_task(animate_upload_progress())
-
-                # Calculate dynamic timeouts based on file size
-                # Assume minimum upload speed of 100KB/s (conservative)
-                estimated_time = file_size / (100 * 1024)
-                timeout_buffer = 600  # 10 minute buffer
-
-                read_timeout = min(estimated_time + timeout_buffer, 7200)  # Max 2 hours
-                write_timeout = min(estimated_time + timeout_buffer, 7200)
-
-                # Send document
-                with open(filepath, 'rb') as f:
-                    await context.bot.send_document(
+                    await status_msg.edit_text(error_msg, parse_mode=ParseMode.HTML)
+                else:
+                    await context.bot.send_message(
                         chat_id=chat_id,
-                        document=f,
-                        filename=filename,
-                        caption=f"✅ File uploaded successfully!\n📦 Size: {format_size(file_size)}",
-                        read_timeout=read_timeout,
-                        write_timeout=write_timeout,
-                        connect_timeout=60,
-                        pool_timeout=60
+                        text=error_msg,
+                        parse_mode=ParseMode.HTML
                     )
+                return
+        
+            if status_msg:
+                await status_msg.edit_text(
+                    f"📤 <b>Uploading to Telegram...</b>\n\n"
+                    f"📦 {format_size(file_size)}\n"
+                    f"⏳ Please wait, this may take several minutes...",
+                    parse_mode=ParseMode.HTML
+                )
+        
+            # Upload with retry logic and progress animation
+            max_retries = 3
+            retry_count = 0
+            upload_success = False
+            upload_start_time = asyncio.get_event_loop().time()
 
-                # Stop animation
-                animation_active[0] = False
-                if upload_animation_task:
-                    await upload_animation_task
-
-                upload_success = True
-                if status_msg:
-                    await status_msg.delete()
-
-            except Exception as upload_error:
-                # Stop animation on error
-                animation_active[0] = False
-                if upload_animation_task:
-                    try:
-                        await upload_animation_task
-                    except:
-                        pass
-
-                retry_count += 1
-                error_type = type(upload_error).__name__
-
-                if retry_count < max_retries:
-                    wait_time = retry_count * 10  # 10, 20, 30 seconds
-                    logger.warning(f"Upload attempt {retry_count} failed: {error_type}. Retrying in {wait_time}s...")
+            upload_animation_task = None
 
+            while retry_count < max_retries and not upload_success:
+                try:
+                    # Start animation task; it runs until cancelled
                     if status_msg:
-                        try:
-                            await status_msg.edit_text(
-                                f"⚠️ <b>Upload Interrupted</b>\n\n"
-                                f"Error: {error_type}\n\n"
-                                f"🔄 Retrying... (Attempt {retry_count + 1}/{max_retries})\n"
-                                f"⏳ Waiting {wait_time} seconds...",
-                                parse_mode=ParseMode.HTML
-                            )
-                        except Exception:
-                            pass
-
-                    await asyncio.sleep(wait_time)
+                        upload_animation_task = asyncio.create_task(
+                            animate_upload_progress(status_msg, file_size, upload_start_time)
+                        )
 
-                    # Reset timer for next attempt
-                    upload_start_time = asyncio.get_event_loop().time()
-                else:
-                    raise upload_error  # Re-raise if all retries failed
+                    # Calculate dynamic timeouts based on file size
+                    # Assume minimum upload speed of 100KB/s (conservative)
+                    estimated_time = file_size / (100 * 1024)
+                    timeout_buffer = 600  # 10 minute buffer
+
+                    read_timeout = min(estimated_time + timeout_buffer, 7200)  # Max 2 hours
+                    write_timeout = min(estimated_time + timeout_buffer, 7200)
+
+                    # Send document: from memory when we never touched disk,
+                    # otherwise from the downloaded file
+                    if _LOCAL_MODE and file_data is None:
+                        # The local Bot API server reads the file straight
+                        # from disk, skipping the HTTP upload of its bytes
+                        await context.bot.send_document(
+                            chat_id=chat_id,
+                            document=filepath,
+                            filename=filename,
+                            caption=f"✅ File uploaded successfully!\n📦 Size: {format_size(file_size)}",
+                            read_timeout=read_timeout,
+                            write_timeout=write_timeout,
+                            connect_timeout=60,
+                            pool_timeout=60
+                        )
+                    elif file_data is not None:
+                        await context.bot.send_document(
+                            chat_id=chat_id,
+                            document=file_data,
+                            filename=filename,
+                            caption=f"✅ File uploaded successfully!\n📦 Size: {format_size(file_size)}",
+                            read_timeout=read_timeout,
+                            write_timeout=write_timeout,
+                            connect_timeout=60,
+                            pool_timeout=60
+                        )
+                    else:
+                        # mmap the file so the upload reads straight out of
+                        # the page cache instead of through Python's
+                        # buffered-IO copy layer
+                        with open(filepath, 'rb') as f:
+                            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                                await context.bot.send_document(
+                                    chat_id=chat_id,
+                                    document=mm,
+                                    filename=filename,
+                                    caption=f"✅ File uploaded successfully!\n📦 Size: {format_size(file_size)}",
+                                    read_timeout=read_timeout,
+                                    write_timeout=write_timeout,
+                                    connect_timeout=60,
+                                    pool_timeout=60
+                                )
+
+                    # Stop animation
+                    if upload_animation_task:
+                        await _cancel_task(upload_animation_task)
+
+                    upload_success = True
+                    if status_msg:
+                        await status_msg.delete()
+
+                except Exception as upload_error:
+                    # Stop animation on error
+                    if upload_animation_task:
+                        await _cancel_task(upload_animation_task)
+
+                    retry_count += 1
+                    error_type = type(upload_error).__name__
+
+                    if retry_count < max_retries:
+                        wait_time = retry_count * 10  # 10, 20, 30 seconds
+                        logger.warning(f"Upload attempt {retry_count} failed: {error_type}. Retrying in {wait_time}s...")
+
+                        if status_msg:
+                            try:
+                                await status_msg.edit_text(
+                                    f"⚠️ <b>Upload Interrupted</b>\n\n"
+                                    f"Error: {error_type}\n\n"
+                                    f"🔄 Retrying... (Attempt {retry_count + 1}/{max_retries})\n"
+                                    f"⏳ Waiting {wait_time} seconds...",
+                                    parse_mode=ParseMode.HTML
+                                )
+                            except Exception:
+                                pass
+
+                        await asyncio.sleep(wait_time)
+
+                        # Reset timer for next attempt
+                        upload_start_time = asyncio.get_event_loop().time()
+                    else:
+                        raise upload_error  # Re-raise if all retries failed
         
-    except Exception as e:
-        error_type = type(e).__name__
-        error_msg = f"❌ <b>Upload Failed</b>\n\n"
+        except Exception as e:
+            error_type = type(e).__name__
+            error_msg = f"❌ <b>Upload Failed</b>\n\n"
         
-        # Categorize errors and provide specific guidance
-        if "NetworkError" in error_type or "ReadError" in error_type or "WriteError" in error_type:
-            error_msg += (
-                f"⚠️ <b>Network connection issue</b>\n\n"
-                f"The upload was interrupted due to network problems.\n\n"
-                f"💡 <b>Possible causes:</b>\n"
-                f"• Unstable internet connection\n"
-                f"• File is very large ({format_size(file_size) if filepath and filepath.exists() else 'unknown'})\n"
-                f"• Server connectivity issues\n\n"
-                f"🔄 <b>Please try:</b>\n"
-                f"• Check your internet connection\n"
-                f"• Try again during off-peak hours\n"
-                f"• Use a wired connection if possible\n"
-                f"• Try a smaller file first to test"
-            )
-        elif "Timed out" in str(e) or "timeout" in str(e).lower():
-            error_msg += (
-                f"⚠️ <b>Upload timeout</b>\n\n"
-                f"The file took too long to upload.\n\n"
-                f"💡 <b>Suggestions:</b>\n"
-                f"• Your upload speed may be slow\n"
-                f"• Try during better network conditions\n"
-                f"• Consider using a smaller file"
-            )
-        else:
-            error_msg += f"<code>{error_type}: {str(e)}</code>\n\n"
-            error_msg += "Please try again or contact support."
+            # Categorize errors and provide specific guidance
+            if "NetworkError" in error_type or "ReadError" in error_type or "WriteError" in error_type:
+                error_msg += (
+                    f"⚠️ <b>Network connection issue</b>\n\n"
+                    f"The upload was interrupted due to network problems.\n\n"
+                    f"💡 <b>Possible causes:</b>\n"
+                    f"• Unstable internet connection\n"
+                    f"• File is very large ({format_size(file_size) if filepath and filepath.exists() else 'unknown'})\n"
+                    f"• Server connectivity issues\n\n"
+                    f"🔄 <b>Please try:</b>\n"
+                    f"• Check your internet connection\n"
+                    f"• Try again during off-peak hours\n"
+                    f"• Use a wired connection if possible\n"
+                    f"• Try a smaller file first to test"
+                )
+            elif "Timed out" in str(e) or "timeout" in str(e).lower():
+                error_msg += (
+                    f"⚠️ <b>Upload timeout</b>\n\n"
+                    f"The file took too long to upload.\n\n"
+                    f"💡 <b>Suggestions:</b>\n"
+                    f"• Your upload speed may be slow\n"
+                    f"• Try during better network conditions\n"
+                    f"• Consider using a smaller file"
+                )
+            else:
+                error_msg += f"<code>{error_type}: {str(e)}</code>\n\n"
+                error_msg += "Please try again or contact support."
         
-        if status_msg:
-            await status_msg.edit_text(error_msg, parse_mode=ParseMode.HTML)
-        else:
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=error_msg,
-                parse_mode=ParseMode.HTML
-            )
-        logger.error(f"Download/Upload error: {e}", exc_info=True)
+            if status_msg:
+                await status_msg.edit_text(error_msg, parse_mode=ParseMode.HTML)
+            else:
+                await context.bot.send_message(
+                    chat_id=update.effective_chat.id,
+                    text=error_msg,
+                    parse_mode=ParseMode.HTML
+                )
+            logger.error(f"Download/Upload error: {e}", exc_info=True)
     
-    finally:
-        # Cleanup: Delete downloaded file
-        if filepath and filepath.exists():
-            try:
-                filepath.unlink()
-                logger.info(f"Deleted file: {filepath}")
-            except Exception as e:
-                logger.error(f"Error deleting file: {e}")
+        finally:
+            # Cleanup: Delete downloaded file
+            if filepath and filepath.exists():
+                try:
+                    filepath.unlink()
+                    logger.info(f"Deleted file: {filepath}")
+                except Exception as e:
+                    logger.error(f"Error deleting file: {e}")
         
-        # Clear user session
-        if user_id in user_sessions:
-            del user_sessions[user_id]
+            # Clear user session
+            context.user_data.pop('session', None)
 
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancel current operation"""
-    user_id = update.effective_user.id
-    if user_id in user_sessions:
-        del user_sessions[user_id]
-    
+    context.user_data.pop('session', None)
+
     await update.message.reply_text(
         "❌ Operation cancelled. Send /download to start again."
     )
     return ConversationHandler.END
 
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# All 16 possible bars, built once; the progress callback fires thousands
+# of times per download and only ever needs to index this table
+_PROGRESS_BAR_LENGTH = 15
+PROGRESS_BARS = tuple(
+    f"[{'█' * i}{'░' * (_PROGRESS_BAR_LENGTH - i)}]"
+    for i in range(_PROGRESS_BAR_LENGTH + 1)
+)
+
+
+@functools.lru_cache(maxsize=1024)
 def format_size(size_bytes: int) -> str:
     """Format bytes to human readable size"""
     if not size_bytes:
         return "Unknown"
-    
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.2f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.2f} PB"
+
+    # log2 // 10 picks the unit directly instead of looping and dividing
+    exp = min(int(math.log2(size_bytes)) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (exp * 10)):.2f} {_SIZE_UNITS[exp]}"
 
 
-def create_progress_bar(progress: int, length: int = 15) -> str:
-    """Create an animated progress bar"""
-    filled = int(length * progress / 100)
-    bar = "█" * filled + "░" * (length - filled)
-    return f"[{bar}]"
+def create_progress_bar(progress: int) -> str:
+    """Return the progress bar for a percentage"""
+    filled = int(_PROGRESS_BAR_LENGTH * progress / 100)
+    return PROGRESS_BARS[min(max(filled, 0), _PROGRESS_BAR_LENGTH)]
 
 
 def main() -> None:
@@ -631,26 +933,50 @@ def main() -> None:
         print("On Linux/Mac: export BOT_TOKEN=your_bot_token_here")
         return
 
+    # uvloop speeds up every socket operation aiohttp and the telegram
+    # library make; fall back silently where it isn't available (Windows)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     # Create application with configurable API server
     # On hosting platforms like Pella.app, use official API by default
     import json
+    local_api = False
     try:
         with open('api_config.json', 'r') as config_file:
             config = json.load(config_file)
-            if config.get('use_local_api', False):  # Changed default to False for hosting
-                # For local API, construct the full base URL with bot prefix
-                base_url = f"{config.get('local_api_url', 'http://localhost:8081')}/bot"
-                print(f"[INFO] Using local API server: {base_url}")
-            else:
-                # For official API, construct the full base URL with bot prefix
-                base_url = f"{config.get('official_api_url', 'https://api.telegram.org')}/bot"
-                print(f"[INFO] Using official API server: {base_url}")
-        application = Application.builder().token(BOT_TOKEN).base_url(base_url).build()
+        local_api = config.get('use_local_api', False)  # Default False for hosting
+        if local_api:
+            # For local API, construct the full base URL with bot prefix
+            base_url = f"{config.get('local_api_url', 'http://localhost:8081')}/bot"
+            print(f"[INFO] Using local API server: {base_url}")
+        else:
+            # For official API, construct the full base URL with bot prefix
+            base_url = f"{config.get('official_api_url', 'https://api.telegram.org')}/bot"
+            print(f"[INFO] Using official API server: {base_url}")
     except FileNotFoundError:
         # Fallback to official API if config file doesn't exist
         base_url = "https://api.telegram.org/bot"
         print(f"[INFO] Using official API server: {base_url}")
-        application = Application.builder().token(BOT_TOKEN).base_url(base_url).build()
+
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .base_url(base_url)
+        .post_shutdown(close_session)
+    )
+    if local_api:
+        # local_mode lets the bot hand the local server filesystem paths
+        # instead of re-uploading bytes over HTTP, and the local server
+        # accepts files up to 4GB
+        global _LOCAL_MODE, MAX_TELEGRAM_SIZE
+        _LOCAL_MODE = True
+        MAX_TELEGRAM_SIZE = 4 * 1024 ** 3
+        builder = builder.local_mode(True)
+    application = builder.build()
     
     # Conversation handler for download process
     conv_handler = ConversationHandler(